@@ -1,8 +1,146 @@
 import subprocess
 import os
 import datetime
+import shutil
+import struct
+import wave
+import warnings
+from collections import deque
+
+try:
+    # audioop 在 Python 3.13 已移除，無法使用時一律改用 ffmpeg
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', DeprecationWarning)
+        import audioop
+except ImportError:
+    audioop = None
+
+def _ffmpeg_error(cmd, returncode, tail_lines=20):
+    """轉檔失敗時重新執行一次並收集 stderr 的最後幾行，組成錯誤訊息"""
+    error_msg = f"ffmpeg failed with error code {returncode}\n"
+    rerun = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    tail = deque(rerun.stderr.decode('utf-8', errors='replace').splitlines(), maxlen=tail_lines)
+    if tail:
+        error_msg += "Error output: " + "\n".join(tail) + "\n"
+    return error_msg
+
+def _ffmpeg_to_alaw(input_file, max_size):
+    """以 ffmpeg 將任意格式轉為 A-law，回傳 (資料, 是否截斷)"""
+    # G.711 A-law: 8000 Hz * 1 byte per sample = 8000 bytes/sec
+    # 直接從 ffmpeg 的 stdout 讀取編碼結果，在記憶體中限制在 max_size 以內，
+    # 不需先寫檔再檢查大小、截斷
+    cmd = [
+        'ffmpeg', '-hide_banner', '-nostats',
+        '-loglevel', 'error',     # 只輸出錯誤訊息
+        '-i', input_file,
+        '-acodec', 'pcm_alaw',    # G.711 A-law 編碼
+        '-ar', '8000',            # 取樣率 8kHz
+        '-ac', '1',               # 單聲道
+        '-f', 'alaw',             # 輸出格式為 A-law
+        '-fs', str(max_size),     # 達到大小上限後 ffmpeg 自行停止輸出
+        'pipe:1'                  # 輸出到 stdout
+    ]
+
+    buf = bytearray(max_size)
+    mv = memoryview(buf)
+    n = 0
+    truncated = False
+    try:
+        # 正常情況下不收集 stderr，避免緩衝 ffmpeg 的輸出
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    except FileNotFoundError:
+        raise RuntimeError("ffmpeg is not installed or not found in system PATH. Please install ffmpeg and try again.")
+
+    with proc:
+        while n < max_size:
+            got = proc.stdout.readinto(mv[n:n + 64 * 1024])
+            if not got:
+                break
+            n += got
+        if n >= max_size:
+            # 已達大小上限（-fs 可能略為超出），其餘輸出不需要
+            truncated = True
+            if proc.poll() is None:
+                proc.terminate()
+
+    if proc.returncode != 0 and not truncated:
+        raise RuntimeError(_ffmpeg_error(cmd, proc.returncode))
+
+    return mv[:n], truncated
+
+def _wav_to_alaw(input_file, max_size):
+    """
+    以 audioop 在行程內將 8kHz PCM WAV 轉為 A-law，回傳 (資料, 是否截斷)
+
+    需要重新取樣（audioop.ratecv 沒有抗混疊濾波）、非 PCM WAV
+    或無法使用 audioop 時回傳 None，由呼叫端改用 ffmpeg。
+    """
+    if audioop is None:
+        return None
+    try:
+        with wave.open(input_file, 'rb') as w:
+            channels = w.getnchannels()
+            width = w.getsampwidth()
+            if w.getframerate() != 8000:
+                return None
+            nframes = w.getnframes()
+            # 8kHz 單聲道 A-law 每個影格 1 byte，只讀取 max_size 個影格
+            pcm = w.readframes(min(nframes, max_size))
+    except (wave.Error, EOFError, OSError):
+        return None
+    if channels not in (1, 2):
+        return None
+
+    if width == 1:
+        # 8-bit WAV 為無號數，轉為有號數
+        pcm = audioop.bias(pcm, 1, -128)
+    if channels == 2:
+        pcm = audioop.tomono(pcm, width, 0.5, 0.5)
+    if width != 2:
+        pcm = audioop.lin2lin(pcm, width, 2)
+
+    alaw = audioop.lin2alaw(pcm, 2)
+    return alaw, nframes > max_size
+
+def _alaw_wav_to_alaw(input_file, max_size):
+    """
+    檢查 WAV 標頭，若已是 A-law / 8kHz / 單聲道則直接取出 data 區塊，回傳 (資料, 是否截斷)
+
+    不符合條件時回傳 None。
+    """
+    try:
+        with open(input_file, 'rb') as f:
+            riff = f.read(12)
+            if len(riff) < 12 or riff[:4] != b'RIFF' or riff[8:12] != b'WAVE':
+                return None
+            is_alaw = False
+            while True:
+                header = f.read(8)
+                if len(header) < 8:
+                    return None
+                chunk_id, chunk_size = struct.unpack('<4sI', header)
+                if chunk_id == b'fmt ':
+                    fmt = f.read(chunk_size + (chunk_size & 1))
+                    # wFormatTag=6 (A-law), nChannels=1, nSamplesPerSec=8000
+                    tag, channels, rate = struct.unpack('<HHI', fmt[:8])
+                    is_alaw = (tag, channels, rate) == (6, 1, 8000)
+                    if not is_alaw:
+                        return None
+                elif chunk_id == b'data':
+                    if not is_alaw:
+                        return None
+                    data = f.read(min(chunk_size, max_size))
+                    return data, chunk_size > max_size
+                else:
+                    f.seek(chunk_size + (chunk_size & 1), os.SEEK_CUR)
+    except (OSError, struct.error):
+        return None
 
 def convert_to_g711(input_file, filename='output.g711', max_size=128*1024):
+    # 與其他失敗情況一致，找不到輸入檔時拋出 RuntimeError
+    if not os.path.isfile(input_file):
+        raise RuntimeError(f"Input file not found: {input_file}")
+
     # 以目前這個 .py 檔案所在的目錄為基準
     script_dir = os.path.dirname(os.path.abspath(__file__))
     output_dir = os.path.join(script_dir, 'audio', 'g711')
@@ -16,46 +154,32 @@ def convert_to_g711(input_file, filename='output.g711', max_size=128*1024):
     filename = f"{base_name}_{time_str}.g711"
     output_path = os.path.join(output_dir, filename)
 
-    try:
-        # 先計算最大時長（秒）以確保檔案大小不超過 128KB
-        # G.711 A-law: 8000 Hz * 1 byte per sample = 8000 bytes/sec
-        max_duration = max_size / 8000
-        
-        # 使用 ffmpeg 轉檔，加入時長限制和更詳細的參數
-        cmd = [
-            'ffmpeg', '-i', input_file,
-            '-t', str(max_duration),  # 限制時長
-            '-acodec', 'pcm_alaw',    # G.711 A-law 編碼
-            '-ar', '8000',            # 取樣率 8kHz
-            '-ac', '1',               # 單聲道
-            '-f', 'alaw',             # 輸出格式為 A-law
-            '-y', output_path         # 覆寫輸出檔案
-        ]
-        
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-        
-    except FileNotFoundError:
-        raise RuntimeError("ffmpeg is not installed or not found in system PATH. Please install ffmpeg and try again.")
-    except subprocess.CalledProcessError as e:
-        # 輸出更詳細的錯誤資訊
-        error_msg = f"ffmpeg failed with error code {e.returncode}\n"
-        if e.stderr:
-            error_msg += f"Error output: {e.stderr}\n"
-        if e.stdout:
-            error_msg += f"Standard output: {e.stdout}"
-        raise RuntimeError(error_msg)
-
-    # 確認檔案大小並截斷（如果需要）
-    if os.path.exists(output_path):
-        file_size = os.path.getsize(output_path)
-        if file_size > max_size:
-            with open(output_path, 'rb+') as f:
-                f.truncate(max_size)
-            print(f"警告: 檔案已截斷至 {max_size} bytes")
-        
+    # 輸入已是 G.711 A-law 原始資料時直接複製，不需重新編碼
+    if input_file.lower().endswith('.g711') and os.path.getsize(input_file) <= max_size:
+        tmp_path = output_path + '.tmp'
+        shutil.copyfile(input_file, tmp_path)
+        os.replace(tmp_path, output_path)
         print(f"轉檔成功，檔案大小: {os.path.getsize(output_path)} bytes")
+        return output_path
+
+    if input_file.lower().endswith('.g711'):
+        with open(input_file, 'rb') as f:
+            result = f.read(max_size), True
     else:
-        raise RuntimeError("轉檔後檔案不存在")
+        # A-law WAV 直接取出資料，8kHz PCM WAV 在行程內編碼，其餘格式交給 ffmpeg
+        result = _alaw_wav_to_alaw(input_file, max_size)
+        if result is None:
+            result = _wav_to_alaw(input_file, max_size)
+    if result is None:
+        result = _ffmpeg_to_alaw(input_file, max_size)
+    data, truncated = result
+
+    with open(output_path, 'wb') as f:
+        f.write(data)
+
+    if truncated:
+        print(f"警告: 檔案已截斷至 {max_size} bytes")
+    print(f"轉檔成功，檔案大小: {len(data)} bytes")
 
     return output_path
 
@@ -1,11 +1,167 @@
+import os
+import shutil
+import subprocess
+import threading
+import time
 import cv2
+import numpy as np
 from typing import Optional, Tuple
 
+
+class FFmpegPipeCapture:
+    """
+    以 ffmpeg 子行程解碼 RTSP 並透過 pipe 輸出 BGR rawvideo 的擷取器
+
+    介面與 cv2.VideoCapture 相同（isOpened/grab/retrieve/read/get/set/release），
+    可直接取代 CameraStream.cap 使用。偵測到 NVIDIA GPU 且 ffmpeg 支援時使用 cuvid
+    硬體解碼，cuvid 無法啟動時自動改回軟體解碼。
+    """
+
+    def __init__(self, url: str):
+        self.url = url
+        self.width, self.height, codec = self._probe(url)
+        self.proc: Optional[subprocess.Popen] = None
+        self._raw: Optional[bytearray] = None
+        # grab 只標記有一幀待讀，實際資料在 retrieve 時直接讀入目的陣列
+        self._pending = False
+        self._eof = False
+        self._got_frame = False
+        if not self.width or not self.height:
+            return
+
+        # 每幀大小固定，預先配置丟棄未取用畫面時使用的緩衝區
+        self._raw = bytearray(self.width * self.height * 3)
+        self._start(self._cuvid_decoder(codec))
+
+    def _start(self, hw_decoder: Optional[str]):
+        """啟動 ffmpeg 子行程，hw_decoder 為 None 時使用軟體解碼"""
+        cmd = ['ffmpeg', '-hide_banner', '-loglevel', 'error',
+               '-rtsp_transport', 'tcp', '-fflags', 'nobuffer', '-flags', 'low_delay']
+        if hw_decoder:
+            cmd += ['-c:v', hw_decoder]
+        cmd += ['-i', self.url, '-an', '-f', 'rawvideo', '-pix_fmt', 'bgr24', 'pipe:1']
+        self._hw_decoder = hw_decoder
+        self.proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+
+    @staticmethod
+    def _cuvid_decoder(codec) -> Optional[str]:
+        """偵測到 NVIDIA GPU 且 ffmpeg 支援對應的 cuvid 解碼器時回傳其名稱"""
+        if codec not in ('h264', 'hevc') or not shutil.which('nvidia-smi'):
+            return None
+        name = f'{codec}_cuvid'
+        try:
+            result = subprocess.run(['ffmpeg', '-hide_banner', '-decoders'],
+                                    capture_output=True, text=True, timeout=10)
+        except (FileNotFoundError, subprocess.TimeoutExpired):
+            return None
+        return name if f' {name} ' in result.stdout else None
+
+    @staticmethod
+    def _probe(url: str):
+        """以 ffprobe 取得影像寬、高與編碼格式"""
+        cmd = ['ffprobe', '-v', 'error', '-rtsp_transport', 'tcp',
+               '-select_streams', 'v:0',
+               '-show_entries', 'stream=codec_name,width,height',
+               '-of', 'default=noprint_wrappers=1', url]
+        try:
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
+        except (FileNotFoundError, subprocess.TimeoutExpired):
+            return 0, 0, None
+        info = dict(line.split('=', 1) for line in result.stdout.splitlines() if '=' in line)
+        try:
+            return int(info.get('width', 0)), int(info.get('height', 0)), info.get('codec_name')
+        except ValueError:
+            return 0, 0, None
+
+    def _readinto(self, buf) -> bool:
+        """從 pipe 讀入完整一幀到 buf"""
+        while True:
+            view = memoryview(buf).cast('B')
+            stdout = self.proc.stdout
+            while view:
+                n = stdout.readinto(view)
+                if not n:
+                    break
+                view = view[n:]
+            else:
+                self._got_frame = True
+                return True
+            if self._got_frame or self._hw_decoder is None:
+                self._eof = True
+                return False
+            # cuvid 解碼器無法使用（例如驅動程式不符）時，改用軟體解碼重新啟動
+            self._stop_proc()
+            self._start(None)
+
+    def isOpened(self) -> bool:
+        # ffmpeg 結束後 pipe 中可能仍有畫面，讀到結尾（或 cuvid 改用軟體解碼）後才視為關閉
+        return self.proc is not None and not self._eof
+
+    def grab(self) -> bool:
+        """推進到下一幀；上一幀未被 retrieve 時先讀掉丟棄"""
+        if self.proc is None or self._eof:
+            return False
+        if self._pending and not self._readinto(self._raw):
+            return False
+        self._pending = True
+        return True
+
+    def retrieve(self, image=None):
+        """
+        讀入最後一次 grab 的畫面
+
+        提供尺寸相符的 image 時直接由 pipe 寫入該陣列，不另外複製。
+        """
+        if not self._pending:
+            return False, None
+        self._pending = False
+        shape = (self.height, self.width, 3)
+        if (image is None or image.shape != shape or image.dtype != np.uint8
+                or not image.flags.c_contiguous):
+            image = np.empty(shape, np.uint8)
+        if not self._readinto(image):
+            return False, None
+        return True, image
+
+    def read(self, image=None):
+        if not self.grab():
+            return False, None
+        return self.retrieve(image)
+
+    def get(self, prop_id) -> float:
+        if prop_id == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.width)
+        if prop_id == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.height)
+        return 0.0
+
+    def set(self, prop_id, value) -> bool:
+        # 緩衝與解碼參數已在 ffmpeg 指令列中指定
+        return False
+
+    def _stop_proc(self):
+        self.proc.terminate()
+        try:
+            self.proc.wait(timeout=2)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+            self.proc.wait()
+        self.proc.stdout.close()
+
+    def release(self):
+        if self.proc is not None:
+            self._stop_proc()
+            self.proc = None
+
+
 class CameraStream:
     """攝影機串流類別"""
     
     def __init__(self, ip: str, port: int = 554, user: str = 'admin', 
-                 pwd: str = '123456', stream_path: str = 'stream1'):
+                 pwd: str = '123456', stream_path: str = 'stream1',
+                 target_fps: float = 30.0, backend: str = 'opencv',
+                 display_size: Optional[Tuple[int, int]] = None,
+                 hw_accel: bool = True):
         """
         初始化攝影機串流
         
@@ -15,6 +171,13 @@ class CameraStream:
             user: 使用者帳號
             pwd: 密碼
             stream_path: 串流路徑
+            target_fps: 背景執行緒解碼成影像的最高頻率 (預設: 30)，
+                        超出的畫面只 grab 不 retrieve，節省色彩轉換成本
+            backend: 解碼後端，'opencv' 使用 cv2.VideoCapture，
+                     'ffmpeg' 使用 ffmpeg 子行程 pipe (FFmpegPipeCapture)
+            display_size: 顯示視窗的畫面大小 (寬, 高)，None 表示使用原始解析度
+            hw_accel: 是否要求 OpenCV 使用硬體解碼 (QSV / NVDEC / VideoToolbox 等)，
+                      無可用硬體時 OpenCV 會自動退回軟體解碼
         """
         self.ip = ip
         self.port = port
@@ -22,12 +185,59 @@ class CameraStream:
         self.pwd = pwd
         self.stream_path = stream_path
         self.rtsp_url = f'rtsp://{user}:{pwd}@{ip}:{port}/{stream_path}'
+        self.target_fps = target_fps
+        self.backend = backend
+        self.display_size = display_size
+        self.hw_accel = hw_accel
         self.cap: Optional[cv2.VideoCapture] = None
+        # 低延遲 FFmpeg 參數：改用 TCP 傳輸並關閉 FFmpeg 內部緩衝
+        # 必須在開啟 VideoCapture 前設定；若使用者已自行設定則不覆蓋
+        os.environ.setdefault(
+            "OPENCV_FFMPEG_CAPTURE_OPTIONS",
+            "rtsp_transport;tcp|fflags;nobuffer|flags;low_delay|max_delay;0"
+        )
+
+        # 背景讀取執行緒：只保留最新一幀，顯示端永遠取得最新畫面
+        # _slot 為 (序號, 畫面)，由讀取端整個替換；CPython 的屬性指派是原子操作，
+        # 單一生產者/單一消費者不需加鎖
+        self._slot = (0, None)
+        # 顯示端已取用的最新序號；讀取端據此判斷是否需要解碼新畫面（背壓）
+        self._consumed_seq = 0
+        self._stop = threading.Event()
+        self._reader_thread: Optional[threading.Thread] = None
+        # 雙緩衝：解碼端寫入 _buf[_write_idx]，顯示端讀取另一塊，不需每幀配置新陣列
+        self._buf = None
+        self._write_idx = 0
+        # 縮放後的顯示畫面緩衝區（僅在指定 display_size 時使用）
+        self._display_buf = None
+        # read_frame 重複使用的輸出陣列與快取的 grab/retrieve 方法
+        self._frame_dst = None
+        self._cap_grab = None
+        self._cap_retrieve = None
     
     def connect(self) -> bool:
         """連接攝影機"""
         try:
-            self.cap = cv2.VideoCapture(self.rtsp_url)
+            if self.backend == 'ffmpeg':
+                self.cap = FFmpegPipeCapture(self.rtsp_url)
+            else:
+                # 硬體加速參數必須在開啟時傳入，開啟後再 set 不會生效
+                # （VIDEO_ACCELERATION_ANY 不可搭配 CAP_PROP_HW_DEVICE，否則 OpenCV 會拒絕開啟）
+                self.cap = None
+                if self.hw_accel:
+                    self.cap = cv2.VideoCapture(
+                        self.rtsp_url, cv2.CAP_FFMPEG,
+                        [cv2.CAP_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY])
+                    if not self.cap.isOpened():
+                        # 硬體加速無法使用時改以一般方式開啟
+                        self.cap.release()
+                        self.cap = None
+                if self.cap is None:
+                    self.cap = cv2.VideoCapture(self.rtsp_url, cv2.CAP_FFMPEG)
+                # 只保留最新一幀，避免 read_frame 取得過時畫面
+                self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+            self._cap_grab = self.cap.grab
+            self._cap_retrieve = self.cap.retrieve
             if self.cap.isOpened():
                 print(f"成功連接到攝影機: {self.ip}")
                 return True
@@ -39,31 +249,148 @@ class CameraStream:
             return False
     
     def read_frame(self) -> Tuple[bool, Optional[any]]:
-        """讀取一幀畫面"""
-        if self.cap is None:
+        """
+        讀取一幀畫面
+
+        回傳的陣列只在下一次呼叫 read_frame 之前有效（下一次會寫入同一塊陣列），
+        呼叫端若需保留請自行 copy()。
+        背景讀取執行緒運作中時不直接操作 cap，改為回傳最新一幀的複本。
+        """
+        if self._reader_thread is not None and self._reader_thread.is_alive():
+            frame = self.get_latest_frame()
+            if frame is None:
+                return False, None
+            return True, frame.copy()
+        if self.cap is None or not self._cap_grab():
             return False, None
-        return self.cap.read()
+        if self._frame_dst is None:
+            ret, frame = self._cap_retrieve()
+        else:
+            ret, frame = self._cap_retrieve(self._frame_dst)
+        if ret:
+            # 第一幀或解析度改變時沿用 OpenCV 配置的陣列
+            self._frame_dst = frame
+        return ret, frame
+
+    def _alloc_buffers(self, height: int, width: int):
+        """依畫面尺寸預先配置兩塊 BGR 緩衝區"""
+        self._buf = [np.empty((height, width, 3), np.uint8),
+                     np.empty((height, width, 3), np.uint8)]
+        self._write_idx = 0
+
+    def _reader(self):
+        """背景解碼執行緒：持續讀取畫面並覆寫最新一幀"""
+        min_interval = 1.0 / self.target_fps if self.target_fps > 0 else 0.0
+        # 以固定節拍排程解碼時間，並容許半個間隔的提早，
+        # 避免攝影機幀率與 target_fps 相近時因到達時間抖動而每隔一幀被略過
+        slack = min_interval / 2
+        next_deadline = 0.0
+        grab = self._cap_grab
+        retrieve = self._cap_retrieve
+        monotonic = time.monotonic
+        width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        if width and height:
+            self._alloc_buffers(height, width)
+        while not self._stop.is_set():
+            # grab 只推進解碼器，不產生 numpy 陣列
+            if not grab():
+                print("無法取得畫面")
+                break
+            now = monotonic()
+            seq, latest = self._slot
+            if latest is not None and (seq > self._consumed_seq
+                                       or now < next_deadline - slack):
+                # 顯示端尚未取用上一幀或未到解碼間隔：只 grab 保持解碼器進度
+                continue
+            if self._buf is None:
+                ret, frame = retrieve()
+                if ret:
+                    # 無法事先得知尺寸時，以第一幀的尺寸配置緩衝區
+                    self._alloc_buffers(*frame.shape[:2])
+            else:
+                target = self._buf[self._write_idx]
+                ret, frame = retrieve(target)
+                if ret and frame is not target:
+                    # 解析度改變，OpenCV 重新配置了陣列
+                    self._alloc_buffers(*frame.shape[:2])
+            if not ret:
+                continue
+            # 落後超過一個間隔時重新對齊目前時間，不連續補解碼
+            next_deadline = max(next_deadline + min_interval, now)
+            self._slot = (seq + 1, frame)
+            self._write_idx = 1 - self._write_idx
+        self._stop.set()
+
+    def start_reader(self):
+        """啟動背景讀取執行緒（需先 connect）"""
+        self._stop.clear()
+        self._slot = (0, None)
+        self._consumed_seq = 0
+        self._reader_thread = threading.Thread(target=self._reader, daemon=True)
+        self._reader_thread.start()
+
+    def get_latest_frame(self):
+        """
+        取得最新一幀畫面，尚無畫面時回傳 None
+
+        回傳的陣列為雙緩衝區之一（不複製），只在下一次呼叫 get_latest_frame
+        之前有效：背景執行緒在本次呼叫後只寫入另一塊緩衝區，
+        再次呼叫後才可能覆寫這一塊。呼叫端若需保留更久請自行 copy()。
+        """
+        seq, frame = self._slot
+        self._consumed_seq = seq
+        return frame
     
     def show_live_stream(self, window_name: str = 'Camera Live Stream'):
         """顯示即時串流畫面"""
         if not self.connect():
             return
         
+        if self.display_size is not None:
+            width, height = self.display_size
+            self._display_buf = np.empty((height, width, 3), np.uint8)
+
+        frame_interval = 1.0 / self.target_fps if self.target_fps > 0 else 0.0
+        last_shown_seq = 0
+        next_deadline = time.monotonic()
+        # 迴圈內常用的函式先綁定為區域變數，省去每幀的屬性查找
+        imshow = cv2.imshow
+        waitKey = cv2.waitKey
+        resize = cv2.resize
+        monotonic = time.monotonic
+        display_buf = self._display_buf
+        display_size = self.display_size
+
+        self.start_reader()
         try:
-            while True:
-                ret, frame = self.read_frame()
-                if not ret:
-                    print("無法取得畫面")
-                    break
-                
-                cv2.imshow(window_name, frame)
-                if cv2.waitKey(1) & 0xFF == ord('q'):
+            while not self._stop.is_set():
+                seq, frame = self._slot
+                if seq != last_shown_seq and frame is not None:
+                    if display_buf is not None:
+                        # 直接縮放到預先配置的緩衝區，不必每幀配置新陣列
+                        resize(frame, display_size, dst=display_buf,
+                               interpolation=cv2.INTER_AREA)
+                        frame = display_buf
+                    imshow(window_name, frame)
+                    last_shown_seq = self._consumed_seq = seq
+                    next_deadline = monotonic() + frame_interval
+                    delay = 1
+                else:
+                    # 沒有新畫面時，一次等待到下一幀預計到達的時間
+                    delay = max(1, int((next_deadline - monotonic()) * 1000))
+                if waitKey(delay) & 0xFF == ord('q'):
                     break
         finally:
             self.release()
     
     def release(self):
         """釋放資源"""
+        self._stop.set()
+        reader = self._reader_thread
+        if reader is not None and reader is not threading.current_thread():
+            reader.join(timeout=2)
+        self._reader_thread = None
         if self.cap:
             self.cap.release()
         cv2.destroyAllWindows()
@@ -79,4 +406,3 @@ if __name__ == "__main__":
         pwd='123456'
     )
     camera.show_live_stream('VIGI C440 Live')
-
@@ -1,8 +1,24 @@
 from vigiapi4cam import *
-import time
 import threading
 
 
+def _int_or(s, default):
+    """將輸入字串轉為整數，空字串或非 ASCII 數字時回傳預設值"""
+    return int(s) if s and s.isascii() and s.isdigit() else default
+
+
+def _enter_event():
+    """啟動背景執行緒等待使用者按 Enter，回傳按下後會被設定的 Event"""
+    evt = threading.Event()
+
+    def _wait_enter():
+        input()
+        evt.set()
+
+    threading.Thread(target=_wait_enter, daemon=True).start()
+    return evt
+
+
 if __name__ == "__main__":
     # 手動警報持續時間 (秒)
     ALARM_DURATION = 5 
@@ -24,18 +40,18 @@ if __name__ == "__main__":
             sound_id_str = input("請輸入要觸發的聲音 ID (例如 1 或 2，預設為 1): ").strip()
             volume_str = input("請輸入音量 (0-100，預設為 30): ").strip()
             
-            sound_id = int(sound_id_str) if sound_id_str.isdigit() else 1
-            volume = int(volume_str) if volume_str.isdigit() else 30
+            sound_id = _int_or(sound_id_str, 1)
+            volume = _int_or(volume_str, 30)
 
             if vigi_cam.trigger_manual_alarm(action="start", sound_id=sound_id, volume=volume):
-                print(f"警報已觸發，將在 {ALARM_DURATION} 秒後自動停止...")
-                time.sleep(ALARM_DURATION)
+                print(f"警報已觸發，將在 {ALARM_DURATION} 秒後自動停止（按 Enter 可提前停止）...")
+                _enter_event().wait(ALARM_DURATION)
                 vigi_cam.trigger_manual_alarm(action="stop")
             
         elif choice == "2":
             print("\n--- 測試喇叭聲音 ---")
             sound_id_str = input("請輸入要測試的聲音 ID (例如 0 或 1，預設為 1): ").strip()
-            sound_id = int(sound_id_str) if sound_id_str.isdigit() else 1
+            sound_id = _int_or(sound_id_str, 1)
             vigi_cam.test_audio_alarm(sound_id=101)
 
         elif choice == "3":
@@ -58,17 +74,20 @@ if __name__ == "__main__":
             stream_thread_obj.daemon = True
             stream_thread_obj.start()
             
-            print("串流已在背景執行，2秒後觸發警報...")
-            time.sleep(2)
+            print("串流已在背景執行，同時觸發警報（按 Enter 可隨時停止警報與串流）...")
+            stop_evt = _enter_event()
             
+            # 串流已在背景執行緒中連線，直接觸發警報即可
             if vigi_cam.trigger_manual_alarm(action="start", sound_id=1, volume=10):
-                time.sleep(ALARM_DURATION)
+                stop_evt.wait(ALARM_DURATION)
                 vigi_cam.trigger_manual_alarm(action="stop")
             
             print("\n警報演示完畢。串流仍在執行。")
-            input("按 Enter 鍵停止串流並結束程式...")
+            if not stop_evt.is_set():
+                print("按 Enter 鍵停止串流並結束程式...")
+                stop_evt.wait()
             camera_stream.release()
-            time.sleep(1)
+            stream_thread_obj.join(timeout=1)
             
         else:
             print("無效的選項")
@@ -26,13 +26,9 @@ if __name__ == "__main__":
     vigi_cam = VigiApi(IP_ADDRESS, USERNAME, PASSWORD)
     if vigi_cam.authenticate():
         
-        # 執行同步函式
+        # 執行同步函式（內部會先取得一次目前的自訂聲音列表）
         vigi_cam.sync_custom_audios(AUDIO_FILES_TO_SYNC)
 
-        # 同步完成後，再次獲取列表，檢查最終結果
-        print("\n最終攝影機上的自訂聲音列表：")
-        vigi_cam.get_custom_audio_list()
-
         # 將您想刪除的聲音 ID 放入這個列表中
         IDS_TO_DELETE = [103] 
         # 2. 執行刪除操作
@@ -40,25 +36,17 @@ if __name__ == "__main__":
             print(f"=== 已成功發送刪除 ID {IDS_TO_DELETE} 的請求 ===")
         else:
             print(f"=== 刪除 ID {IDS_TO_DELETE} 的請求失敗 ===")
-        
-        # 3. 刪除後，再次獲取列表，確認是否已刪除
-        print("\n刪除後，當前自訂聲音列表：")
-        vigi_cam.get_custom_audio_list()
 
         # --- 設定您要修改的目標 ---
         TARGET_ID_TO_RENAME = 101       # 您想修改哪個 ID 的名稱
         NEW_NAME_FOR_AUDIO = "XDD" # 您想給它取的新名字
-    
-        # 1. 修改前，先看看攝影機上原來的名稱
-        print("修改前，當前自訂聲音列表：")
-        vigi_cam.get_custom_audio_list()
         
-        # 2. 執行修改名稱操作
+        # 3. 執行修改名稱操作
         if vigi_cam.rename_custom_audio(TARGET_ID_TO_RENAME, NEW_NAME_FOR_AUDIO):
             print(f"=== 已成功發送修改 ID {TARGET_ID_TO_RENAME} 名稱的請求 ===")
         else:
             print(f"=== 修改 ID {TARGET_ID_TO_RENAME} 名稱的請求失敗 ===")
         
-        # 3. 修改後，再次獲取列表，確認名稱是否已更新
-        print("\n修改後，當前自訂聲音列表：")
+        # 4. 所有操作完成後只取得一次列表，確認同步、刪除與改名的結果
+        print("\n最終攝影機上的自訂聲音列表：")
         vigi_cam.get_custom_audio_list()
\ No newline at end of file
@@ -19,8 +19,13 @@ import os
 import hashlib  # 用於密碼雜湊處理
 import json     # 用於JSON資料格式處理
 import base64   # Base64編碼/解碼
+import logging  # 除錯訊息輸出
+import mmap     # 上傳音檔時以記憶體映射避免複製檔案內容
+from concurrent.futures import ThreadPoolExecutor  # 多台攝影機並行驗證
 from urllib import parse  # URL解析功能
 import urllib3  # HTTP客戶端庫
+from urllib3.fields import RequestField
+from urllib3.filepost import choose_boundary
 
 # 導入自定義的攝影機串流模組
 from cam_stream import CameraStream
@@ -38,10 +43,149 @@ PASSWORD = '123456'          # 登入密碼
 # CONTROL_PORT = 443         # HTTPS控制埠（已整合到類別中）
 # BASE_URL = f"https://{IP_ADDRESS}:{CONTROL_PORT}"  # 基礎URL（已整合到類別中）
 
+# --- JSON 編解碼 ---
+# 有安裝 orjson 時使用（較快，且直接輸出/解析 bytes），否則退回標準庫 json
+try:
+    import orjson
+    _dumps = orjson.dumps
+    _loads = orjson.loads
+except ImportError:
+    def _dumps(obj):
+        # 與 orjson 相同輸出緊湊格式、非 ASCII 字元直接以 UTF-8 輸出，
+        # 兩種實作送出的位元組一致，並直接回傳 bytes，urllib3 不需再編碼
+        return json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    _loads = json.loads  # json.loads 可直接解析 UTF-8 bytes
+
+# RSA PKCS#1 v1.5 填充物件不含狀態，建立一次後重複使用
+_PKCS1_PADDING = padding.PKCS1v15()
+
+# --- 預先序列化的請求內容 ---
+# 內容固定的請求在模組載入時序列化一次，每次呼叫直接送出 bytes
+_AUTH_REQ_BODY = _dumps({'user_management': {'get_encrypt_info': None}, 'method': 'do'})
+
+# 警報基礎參數
+_INIT_ALARM_BODY = _dumps({
+    "msg_alarm": {
+        "chn1_msg_alarm_info": {
+            "sound_alarm_enabled": "off",  # 關閉自動聲音警報
+            "light_alarm_enabled": "off",  # 關閉自動燈光警報
+            "alarm_type": "1"              # 設定預設警報類型
+        }
+    },
+    "audio_config": {
+        "speaker": {
+            "mute": "off",          # 確保揚聲器未靜音
+            "system_volume": "10"   # 設定預設音量
+        }
+    },
+    "method": "set"
+})
+
+# 手動警報觸發/停止
+_MANUAL_ALARM_BODIES = {
+    action: _dumps({"msg_alarm": {"manual_msg_alarm": {"action": action}}, "method": "do"})
+    for action in ("start", "stop")
+}
+
+_CUSTOM_AUDIO_LIST_BODY = _dumps({"usr_def_audio_alarm": {"table": ["usr_def_audio"]}, "method": "get"})
+
+# 只有數值參數的請求使用 bytes 模板（API要求數值為字串格式）
+_SET_VOLUME_TEMPLATE = b'{"audio_config":{"speaker":{"system_volume":"%d"}},"method":"set"}'
+_SET_ALARM_TYPE_TEMPLATE = b'{"msg_alarm":{"chn1_msg_alarm_info":{"alarm_type":"%d"}},"method":"set"}'
+_SET_ALARM_TYPE_AND_VOLUME_TEMPLATE = (
+    b'{"msg_alarm":{"chn1_msg_alarm_info":{"alarm_type":"%d"}},'
+    b'"audio_config":{"speaker":{"system_volume":"%d"}},"method":"set"}'
+)
+
+def _check_volume_type(volume):
+    """音量必須為整數；請求範本以 %d 格式化，其他型別會被無聲截斷或轉換"""
+    if isinstance(volume, bool) or not isinstance(volume, int):
+        raise TypeError(f"音量必須為整數，收到 {type(volume).__name__}: {volume!r}")
+
+def _load_response(data):
+    """
+    解析攝影機回應，並將 error_code 統一轉為整數
+
+    依韌體不同 error_code 可能是整數或字串，在此轉換一次，之後只需比較整數。
+    缺少或無法辨識的 error_code 視為 -1。
+    """
+    response_data = _loads(data)
+    if isinstance(response_data, dict):
+        err = response_data.get("error_code", -1)
+        if not isinstance(err, int):
+            try:
+                err = int(err)
+            except (TypeError, ValueError):
+                err = -1
+            response_data["error_code"] = err
+    return response_data
+
+def _ok(response):
+    """判斷攝影機回應是否成功（error_code 為 0）"""
+    return bool(response) and response.get("error_code") == 0
+
+# 請求/回應的除錯訊息使用 logging 輸出，需要時以 logging.basicConfig(level=logging.DEBUG) 開啟
+logger = logging.getLogger(__name__)
+
 # --- 忽略SSL憑證警告 ---
 # 由於攝影機使用自簽名憑證，需要忽略SSL警告
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+# --- 共用的SSL上下文 ---
+# 所有 VigiApi 實例共用同一個 SSLContext（可安全地跨連線、跨執行緒使用），
+# 多台攝影機時不必重複建立 OpenSSL 上下文
+# 使用AES256-GCM-SHA384加密套件以確保安全性
+_SSL_CONTEXT = urllib3.util.create_urllib3_context()
+_SSL_CONTEXT.set_ciphers("AES256-GCM-SHA384")
+_SSL_CONTEXT.check_hostname = False  # 停用主機名稱檢查（因為使用IP位址）
+
+class _MultipartFileBody:
+    """
+    以 mmap 映射檔案內容的 multipart/form-data 上傳內容
+
+    parts 為 [前置標頭, 檔案內容, 結尾邊界] 三段，可直接作為 urllib3 的 body
+    逐段送出，不需把整個檔案讀入記憶體再組成新的 bytes。
+    使用完畢後需呼叫 close()（或使用 with 陳述式）釋放映射。
+    """
+
+    def __init__(self, field_name, file_path, file_name):
+        boundary = choose_boundary()
+        field = RequestField(name=field_name, data=b"", filename=file_name)
+        field.make_multipart(content_type='application/octet-stream')
+        # 與 urllib3.encode_multipart_formdata 產生的格式相同
+        preamble = f"--{boundary}\r\n".encode("latin-1") + field.render_headers().encode("utf-8")
+        postamble = f"\r\n--{boundary}--\r\n".encode("latin-1")
+
+        self._file = open(file_path, 'rb')
+        self._mmap = None
+        self._view = b""
+        try:
+            if os.fstat(self._file.fileno()).st_size:
+                # 空檔案無法 mmap，維持 b""
+                self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+                self._view = memoryview(self._mmap)
+        except Exception:
+            self._file.close()
+            raise
+
+        self.parts = [preamble, self._view, postamble]
+        self.content_type = f"multipart/form-data; boundary={boundary}"
+        self.content_length = len(preamble) + len(self._view) + len(postamble)
+
+    def close(self):
+        if isinstance(self._view, memoryview):
+            self._view.release()
+        if self._mmap is not None:
+            self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
 class VigiApi:
     """
     VIGI攝影機API控制類別
@@ -56,7 +200,7 @@ class VigiApi:
         stok (str): 認證後取得的session token
         base_url (str): API的基礎URL
         headers (dict): HTTP請求標頭
-        http (urllib3.PoolManager): HTTP客戶端實例
+        http (urllib3.HTTPSConnectionPool): 連到攝影機的HTTPS連線池
         _alarm_initialized (bool): 警報設定是否已初始化
     """
     
@@ -73,23 +217,51 @@ class VigiApi:
         self.ip = ip
         self.username = username
         self.password = password
-        self.stok = None  # 認證token，初始為空
+        self.stok = None  # 認證token，初始為空（同時清空下方快取的請求路徑）
+        
+        # VIGI API要求在密碼前加上固定前綴後計算MD5並轉為大寫，於此預先計算
+        self._password_md5 = hashlib.md5(
+            f"TPCQ75NF2Y:{password}".encode('utf-8')
+        ).hexdigest().upper()
+        # RSA加密的明文為 "<MD5>:<nonce>"，固定的前半段預先轉為 bytes
+        self._auth_plaintext_prefix = f"{self._password_md5}:".encode('ascii')
         
         # 建立API連線URL（固定使用443埠）
         self.base_url = f"https://{self.ip}:443"
         
-        # 設定HTTP請求標頭
+        # 設定HTTP請求標頭（keep-alive 讓所有 API 呼叫共用同一條 TLS 連線）
         self.headers = {
             "Accept": "application/json", 
-            "Content-Type": "application/json; charset=UTF-8"
+            "Content-Type": "application/json; charset=UTF-8",
+            "Connection": "keep-alive"
         }
         
-        # 建立HTTP客戶端實例
+        # 建立HTTP客戶端實例（整個實例生命週期共用，避免每次請求重新握手）
         self.http = self._create_http_client()
         
         # 警報初始化狀態標記
         self._alarm_initialized = False
 
+        # 攝影機RSA公鑰快取（重新驗證時公鑰通常不變）
+        self._pubkey_der_b64 = None
+        self._pubkey_obj = None
+
+    @property
+    def stok(self):
+        """認證後取得的session token"""
+        return self._stok
+
+    @stok.setter
+    def stok(self, value):
+        # 含 stok 的請求路徑在 token 變更時建立一次，不必每次請求重新組字串
+        self._stok = value
+        if value:
+            self._ds_path = f"/stok={value}/ds"
+            self._upload_path = f"/stok={value}/admin/system/upload_usr_def_audio"
+        else:
+            self._ds_path = None
+            self._upload_path = None
+
     def _create_http_client(self):
         """
         建立自定義的HTTP客戶端
@@ -98,40 +270,66 @@ class VigiApi:
         來確保連線的相容性和安全性。
         
         Returns:
-            urllib3.PoolManager: 配置好的HTTP客戶端實例
+            urllib3.HTTPSConnectionPool: 配置好的HTTPS連線池
         """
-        # 建立SSL上下文並設定加密套件
-        # 使用AES256-GCM-SHA384加密套件以確保安全性
-        context = urllib3.util.create_urllib3_context()
-        context.set_ciphers("AES256-GCM-SHA384")
-        context.check_hostname = False  # 停用主機名稱檢查（因為使用IP位址）
-        
-        # 建立並回傳HTTP連線池管理器
+        # 只連線到單一攝影機，直接建立該主機的連線池，
+        # 省去 PoolManager 每次請求的 URL 解析與連線池查找
         # cert_reqs="CERT_NONE" 表示不驗證SSL憑證（攝影機使用自簽名憑證）
-        return urllib3.PoolManager(cert_reqs="CERT_NONE", ssl_context=context)
+        # maxsize=4 讓並行請求也能重用連線；block=False 表示連線用盡時另開新連線而非等待
+        # 搭配 Connection: keep-alive，authenticate() 建立的 TLS 連線會保留在池中，
+        # 之後的 set_volume / trigger_manual_alarm 等請求直接重用，不需再次握手
+        return urllib3.HTTPSConnectionPool(
+            self.ip,
+            port=443,
+            maxsize=4,
+            block=False,
+            cert_reqs="CERT_NONE",
+            ssl_context=_SSL_CONTEXT
+        )
+
+    def _post(self, path, body, headers=None, timeout=5, idempotent=False):
+        """
+        以 POST 將資料送到攝影機的指定路徑
+        
+        重用連線池中的 keep-alive 連線（urllib3 取出閒置連線時會先檢查是否已被
+        攝影機關閉，已關閉則重新連線）。送出後才發生的協定錯誤
+        （RemoteDisconnected 等）無法判斷攝影機是否已執行請求，
+        因此只有 idempotent=True 的請求（查詢與 "set"）會重新連線並重送一次；
+        觸發警報、確認上傳等 "do" 動作不重送，避免重複執行。
+        
+        Args:
+            path (str): 請求路徑，例如 "/" 或 "/stok=.../ds"
+            body: 請求內容（bytes 或可迭代的 bytes 片段）
+            headers (dict, optional): HTTP標頭，預設使用 self.headers
+            timeout (float, optional): 逾時秒數，預設為5
+            idempotent (bool, optional): 重送不會改變結果的請求才設為 True，預設為 False
+            
+        Returns:
+            urllib3.BaseHTTPResponse: 攝影機的回應
+        """
+        if headers is None:
+            headers = self.headers
+        try:
+            return self.http.urlopen("POST", path, body=body, headers=headers,
+                                     timeout=timeout, retries=False)
+        except urllib3.exceptions.ProtocolError:
+            if not idempotent:
+                raise
+            return self.http.urlopen("POST", path, body=body, headers=headers,
+                                     timeout=timeout, retries=False)
 
     def _get_md5_password(self):
         """
-        產生密碼的MD5雜湊值
+        取得密碼的MD5雜湊值
         
         VIGI API需要特定格式的密碼雜湊，必須在密碼前加上固定前綴
-        然後計算MD5雜湊值並轉為大寫。
+        然後計算MD5雜湊值並轉為大寫。密碼在實例生命週期內不變，
+        因此雜湊值於 __init__ 計算一次後快取。
         
         Returns:
             str: 加密後的密碼雜湊值（大寫）
         """
-        # VIGI API要求的固定前綴
-        prefix = "TPCQ75NF2Y:"
-        
-        # 組合前綴和原始密碼
-        prefixed_password = f"{prefix}{self.password}"
-        
-        # 計算MD5雜湊值
-        md5 = hashlib.md5()
-        md5.update(prefixed_password.encode('utf-8'))
-        
-        # 回傳大寫的十六進位雜湊值
-        return md5.hexdigest().upper()
+        return self._password_md5
 
     def authenticate(self):
         """
@@ -148,38 +346,33 @@ class VigiApi:
         # print("步驟 1: 正在執行身份驗證...")
         try:
             # === 第一階段：取得加密資訊 ===
-            auth_req_body = {
-                'user_management': {'get_encrypt_info': None}, 
-                'method': 'do'
-            }
-            
             # 發送請求取得nonce和公鑰
-            auth_req = self.http.request(
-                "POST", 
-                f"{self.base_url}/", 
-                headers=self.headers, 
-                body=json.dumps(auth_req_body), 
-                timeout=5
-            )
+            auth_req = self._post("/", _AUTH_REQ_BODY, idempotent=True)
             
             # 解析回應資料
-            auth_data = json.loads(auth_req.data.decode('utf-8'))['data']
+            auth_data = _loads(auth_req.data)['data']
             nonce, key = auth_data['nonce'], auth_data['key']
             
             # === 第二階段：準備加密密碼 ===
-            # 取得MD5加密的密碼
-            password_hash = self._get_md5_password()
-            
-            # 解碼並載入RSA公鑰
-            public_key_der = base64.b64decode(parse.unquote(key))
-            public_key = serialization.load_der_public_key(public_key_der)
+            # 解碼並載入RSA公鑰（公鑰與上次相同時直接沿用已解析的物件）
+            if key == self._pubkey_der_b64:
+                public_key = self._pubkey_obj
+            else:
+                # base64 本身不含 '%'，只有被URL編碼時才需要 unquote
+                if '%' in key:
+                    key = parse.unquote(key)
+                public_key_der = base64.b64decode(key)
+                public_key = serialization.load_der_public_key(public_key_der)
+                self._pubkey_der_b64 = auth_data['key']
+                self._pubkey_obj = public_key
             
-            # 使用RSA公鑰加密密碼+nonce組合
+            # 使用RSA公鑰加密密碼MD5+nonce組合
             encrypted = public_key.encrypt(
-                f"{password_hash}:{nonce}".encode(), 
-                padding.PKCS1v15()
+                self._auth_plaintext_prefix + nonce.encode('utf-8'), 
+                _PKCS1_PADDING
             )
-            encrypted_password = base64.b64encode(encrypted).decode()
+            # base64 只含ASCII字元，JSON 需要 str
+            encrypted_password = base64.b64encode(encrypted).decode('ascii')
             
             # === 第三階段：發送登入請求 ===
             login_body = {
@@ -193,18 +386,13 @@ class VigiApi:
             }
             
             # 發送登入請求
-            resp = self.http.request(
-                "POST", 
-                f"{self.base_url}/", 
-                body=json.dumps(login_body), 
-                headers=self.headers
-            )
+            resp = self._post("/", _dumps(login_body))
             
             # 解析登入回應
-            resp_data = json.loads(resp.data.decode('utf-8'))
+            resp_data = _load_response(resp.data)
             
             # 檢查登入結果
-            if resp_data.get("error_code") == 0 and resp_data.get("stok"):
+            if _ok(resp_data) and resp_data.get("stok"):
                 # 驗證成功，儲存session token
                 self.stok = resp_data["stok"]
                 print(f"  - 驗證成功！取得權杖: {self.stok}\n")
@@ -218,7 +406,27 @@ class VigiApi:
             print(f"身份驗證過程中發生錯誤: {e}")
             return False
 
-    def _send_request(self, payload):
+    @staticmethod
+    def authenticate_batch(instances, max_workers=8):
+        """
+        同時對多台攝影機執行身份驗證
+        
+        各台的網路往返與RSA加密（cryptography 在C程式碼中會釋放GIL）
+        以執行緒池並行處理，總時間接近最慢的一台而非全部相加。
+        
+        Args:
+            instances (list): VigiApi 實例列表
+            max_workers (int, optional): 最大並行數，預設為8
+            
+        Returns:
+            list: 與 instances 順序相同的驗證結果（bool）
+        """
+        if not instances:
+            return []
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(instances))) as executor:
+            return list(executor.map(lambda api: api.authenticate(), instances))
+
+    def _send_request(self, payload, idempotent=False):
         """
         發送API請求的通用方法
         
@@ -226,7 +434,10 @@ class VigiApi:
         並處理錯誤情況。
         
         Args:
-            payload (dict): 要發送的API請求資料
+            payload (dict | bytes): 要發送的API請求資料，
+                                    bytes 表示已序列化的JSON，直接送出
+            idempotent (bool, optional): 查詢或 "set" 請求設為 True，
+                                         連線中斷時可安全重送，預設為 False
             
         Returns:
             dict: API回應資料，若發生錯誤則回傳None
@@ -236,27 +447,21 @@ class VigiApi:
             print("錯誤: 請先執行 authenticate()")
             return None
             
-        # 建立包含session token的完整URL
-        url = f"{self.base_url}/stok={self.stok}/ds"
+        body = payload if isinstance(payload, bytes) else _dumps(payload)
         
-        # 輸出除錯資訊（可選）
-        print(f"  - Payload: {json.dumps(payload)}")
+        # 輸出除錯資訊（僅在開啟 DEBUG 等級時才解碼）
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Payload: %s", body.decode('utf-8'))
         
         try:
             # 發送POST請求
-            response = self.http.request(
-                "POST", 
-                url, 
-                headers=self.headers, 
-                body=json.dumps(payload), 
-                timeout=5
-            )
+            response = self._post(self._ds_path, body, idempotent=idempotent)
             
             # 解析回應資料
-            response_data = json.loads(response.data.decode('utf-8'))
+            response_data = _load_response(response.data)
             
             # 輸出回應資訊（可選）
-            print(f"  - 攝影機回應: {response_data}")
+            logger.debug("攝影機回應: %s", response_data)
             
             return response_data
             
@@ -276,29 +481,11 @@ class VigiApi:
         """
         print("  - 正在初始化警報基礎設定...")
         
-        # 設定警報基礎參數
-        payload = {
-            "msg_alarm": {
-                "chn1_msg_alarm_info": {
-                    "sound_alarm_enabled": "off",  # 關閉自動聲音警報
-                    "light_alarm_enabled": "off",  # 關閉自動燈光警報
-                    "alarm_type": "1"              # 設定預設警報類型
-                }
-            },
-            "audio_config": {
-                "speaker": {
-                    "mute": "off",          # 確保揚聲器未靜音
-                    "system_volume": "10"   # 設定預設音量
-                }
-            },
-            "method": "set"
-        }
-        
-        # 發送設定請求
-        response = self._send_request(payload)
+        # 發送設定請求（警報基礎參數見 _INIT_ALARM_BODY）
+        response = self._send_request(_INIT_ALARM_BODY, idempotent=True)
         
         # 檢查設定結果
-        if response and str(response.get("error_code")) == "0":
+        if _ok(response):
             self._alarm_initialized = True
             print("  - 警報基礎設定初始化成功。\n")
             return True
@@ -319,29 +506,23 @@ class VigiApi:
                          
         Returns:
             bool: 設定成功回傳True，失敗回傳False
+
+        Raises:
+            TypeError: volume 不是整數
         """
-        # 驗證音量範圍
+        # 驗證音量型別與範圍（請求以 %d 格式化，浮點數會被無聲截斷）
+        _check_volume_type(volume)
         if not 0 <= volume <= 100:
             print("錯誤: 音量必須在 0 到 100 之間。")
             return False
             
         print(f"正在設定音量為: {volume}...")
         
-        # 建立音量設定請求
-        payload = {
-            "audio_config": {
-                "speaker": {
-                    "system_volume": str(volume)  # API要求字串格式
-                }
-            }, 
-            "method": "set"
-        }
-        
-        # 發送設定請求
-        response = self._send_request(payload)
+        # 發送音量設定請求
+        response = self._send_request(_SET_VOLUME_TEMPLATE % volume, idempotent=True)
         
         # 檢查設定結果
-        if response and str(response.get("error_code")) == "0":
+        if _ok(response):
             print(f"  - 成功設定音量為 {volume}。\n")
             return True
         else:
@@ -364,23 +545,17 @@ class VigiApi:
         Returns:
             bool: 設定成功回傳True，失敗回傳False
         """
+        if not isinstance(sound_id, int) or sound_id < 0:
+            print("錯誤: 聲音ID必須為非負整數。")
+            return False
+
         print(f"正在設定警報聲音類型為: {sound_id}...")
         
-        # 建立聲音類型設定請求
-        payload = {
-            "msg_alarm": {
-                "chn1_msg_alarm_info": {
-                    "alarm_type": str(sound_id)  # API要求字串格式
-                }
-            }, 
-            "method": "set"
-        }
-        
-        # 發送設定請求
-        response = self._send_request(payload)
+        # 發送聲音類型設定請求
+        response = self._send_request(_SET_ALARM_TYPE_TEMPLATE % sound_id, idempotent=True)
         
         # 檢查設定結果
-        if response and str(response.get("error_code")) == "0":
+        if _ok(response):
             print(f"  - 成功設定聲音類型為 {sound_id}。\n")
             return True
         else:
@@ -407,7 +582,23 @@ class VigiApi:
             
         Returns:
             bool: 操作成功回傳True，失敗回傳False
+
+        Raises:
+            TypeError: action 為 "start" 且 volume 不是整數
         """
+        # 無效的動作或參數直接回傳，不發送請求
+        if action not in ("start", "stop"):
+            print("錯誤: 動作必須為 \"start\" 或 \"stop\"。")
+            return False
+        if action == "start":
+            if not isinstance(sound_id, int) or sound_id < 0:
+                print("錯誤: 聲音ID必須為非負整數。")
+                return False
+            _check_volume_type(volume)
+            if not 0 <= volume <= 100:
+                print("錯誤: 音量必須在 0 到 100 之間。")
+                return False
+
         # 判斷動作類型並準備顯示文字
         action_text = "觸發" if action == "start" else "停止"
         print(f"正在手動{action_text}聲光警報...")
@@ -418,25 +609,23 @@ class VigiApi:
                 return False
 
         # 如果是開始警報，先設定音量和聲音類型
+        # 兩者同為 "set" 方法，合併成一次請求（與 _initialize_alarm_settings 相同做法）
         if action == "start":
-            self.set_volume(volume)
-            self.set_alarm_sound_type(sound_id)
-        
-        # 建立手動警報觸發請求
-        payload = {
-            "msg_alarm": {
-                "manual_msg_alarm": {
-                    "action": action  # "start" 或 "stop"
-                }
-            }, 
-            "method": "do"
-        }
+            print(f"正在設定音量為: {volume}，警報聲音類型為: {sound_id}...")
+            settings_response = self._send_request(
+                _SET_ALARM_TYPE_AND_VOLUME_TEMPLATE % (sound_id, volume), idempotent=True
+            )
+            if _ok(settings_response):
+                print(f"  - 成功設定音量為 {volume}，聲音類型為 {sound_id}。\n")
+            else:
+                print(f"  - 設定音量與聲音類型失敗。")
         
+        # 建立手動警報觸發請求（"start" / "stop" 已預先序列化）
         # 發送警報控制請求
-        response = self._send_request(payload)
+        response = self._send_request(_MANUAL_ALARM_BODIES[action])
         
         # 檢查操作結果
-        if response and str(response.get("error_code")) == "0":
+        if _ok(response):
             print(f"  - 成功{action_text}聲光警報！\n")
             return True
         else:
@@ -463,6 +652,10 @@ class VigiApi:
             此方法只發送測試指令，不會等待播放完成。
             聲音會在攝影機端自動播放一次。
         """
+        if not isinstance(sound_id, int) or sound_id < 0:
+            print("錯誤: 聲音ID必須為非負整數。")
+            return False
+
         print("正在發送聲音測試指令...")
         
         # 建立聲音測試請求
@@ -479,7 +672,7 @@ class VigiApi:
         response = self._send_request(payload)
         
         # 檢查測試結果
-        if response and str(response.get("error_code")) == "0":
+        if _ok(response):
             print("  - 成功發送聲音測試指令。\n")
             return True
         else:
@@ -523,10 +716,9 @@ class VigiApi:
         獲取攝影機上已存在的自訂聲音列表。
         """
         print("步驟 2: 正在獲取自訂聲音列表...")
-        payload = {"usr_def_audio_alarm": {"table": ["usr_def_audio"]}, "method": "get"}
-        response = self._send_request(payload)
+        response = self._send_request(_CUSTOM_AUDIO_LIST_BODY, idempotent=True)
         
-        if not response or str(response.get("error_code")) != "0":
+        if not _ok(response):
             print(f"  - 錯誤：從攝影機獲取資料失敗或收到錯誤碼。\n    - 回應: {response}")
             return []
 
@@ -539,19 +731,20 @@ class VigiApi:
                 return []
 
             # --- 這是處理動態鍵名 ("file_1", "file_2") 的核心邏輯 ---
-            processed_list = []
-            for item_wrapper in raw_audio_list:
-                # item_wrapper 的形式是 {"file_X": {...}}
-                # 我們只需要裡面的值，不需要鍵名
-                if isinstance(item_wrapper, dict) and item_wrapper:
-                    # 取得字典中的第一個值，這就是我們需要的聲音資訊物件
-                    audio_info = next(iter(item_wrapper.values()))
-                    
-                    # 解碼 URL 編碼的名稱 (例如 'custom%20audio%201' -> 'custom audio 1')
-                    if 'name' in audio_info:
-                        audio_info['name'] = parse.unquote(audio_info['name'])
-                        
-                    processed_list.append(audio_info)
+            # item_wrapper 的形式是 {"file_X": {...}}
+            # 我們只需要裡面的值（聲音資訊物件），不需要鍵名
+            # 同時解碼 URL 編碼的名稱 (例如 'custom%20audio%201' -> 'custom audio 1')
+            unquote = parse.unquote
+            audio_infos = (
+                next(iter(item_wrapper.values()))
+                for item_wrapper in raw_audio_list
+                if isinstance(item_wrapper, dict) and item_wrapper
+            )
+            processed_list = [
+                {**audio_info, 'name': unquote(audio_info['name'])}
+                if isinstance(audio_info, dict) and 'name' in audio_info else audio_info
+                for audio_info in audio_infos
+            ]
             # --- 核心邏輯結束 ---
             
             print("  - 解析成功，當前自訂聲音列表:")
@@ -589,49 +782,53 @@ class VigiApi:
         if sound_name is None:
             sound_name = os.path.splitext(file_name_only)[0]
 
-        # --- 第一步: 將檔案上傳到臨時位置 ---
-        upload_url = f"{self.base_url}/stok={self.stok}/admin/system/upload_usr_def_audio"
-        print(f"步驟 3: [上傳階段] 正在上傳 '{file_name_only}'...")
-        
+        # --- 準備上傳內容 ---
         try:
-            with open(file_path, 'rb') as f:
-                file_data = f.read()
-
-            encoded_body, content_type = urllib3.encode_multipart_formdata({
-                'filename': (file_name_only, file_data, 'application/octet-stream')
-            })
-            
-            upload_headers = self.headers.copy()
-            upload_headers['Content-Type'] = content_type
-
-            response = self.http.request("POST", upload_url, headers=upload_headers, body=encoded_body, timeout=15)
-            upload_response_data = json.loads(response.data.decode('utf-8'))
-            print(f"  - 上傳回應: {upload_response_data}")
-
-            if str(upload_response_data.get("error_code")) != "0":
-                print(f"  - 錯誤：檔案上傳階段失敗，錯誤碼: {upload_response_data.get('error_code')}")
-                return False
-                
+            multipart = _MultipartFileBody('filename', file_path, file_name_only)
         except Exception as e:
-            print(f"  - 錯誤：檔案上傳過程中發生錯誤: {e}")
+            print(f"  - 錯誤：讀取音檔 '{file_name_only}' 時發生錯誤: {e}")
             return False
 
-        # --- 第二步: 確認上傳，將臨時檔案指派給指定的ID和名稱 ---
-        print(f"步驟 4: [確認階段] 正在將上傳的檔案指派給 ID {sound_id}，並命名為 '{sound_name}'...")
-        confirm_payload = {
-            "system": {
-                "upload_usr_def_audio": {
-                    "id": sound_id,
-                    "name": sound_name
-                }
-            },
-            "method": "do"
+        # 直接建立上傳用標頭，不需複製 self.headers 再覆寫 Content-Type
+        upload_headers = {
+            "Accept": "application/json",
+            "Connection": "keep-alive",
+            "Content-Type": multipart.content_type,
+            "Content-Length": str(multipart.content_length)
         }
+
+        with multipart:
+            # --- 第一步: 將檔案上傳到臨時位置 ---
+            print(f"步驟 3: [上傳階段] 正在上傳 '{file_name_only}'...")
+            try:
+                response = self._post(self._upload_path, multipart.parts, headers=upload_headers, timeout=15)
+                upload_response_data = _load_response(response.data)
+                print(f"  - 上傳回應: {upload_response_data}")
+
+                if not _ok(upload_response_data):
+                    print(f"  - 錯誤：檔案上傳階段失敗，錯誤碼: {upload_response_data.get('error_code')}")
+                    return False
+                    
+            except Exception as e:
+                print(f"  - 錯誤：檔案上傳過程中發生錯誤: {e}")
+                return False
+
+            # --- 第二步: 確認上傳，將臨時檔案指派給指定的ID和名稱 ---
+            print(f"步驟 4: [確認階段] 正在將上傳的檔案指派給 ID {sound_id}，並命名為 '{sound_name}'...")
+            confirm_payload = {
+                "system": {
+                    "upload_usr_def_audio": {
+                        "id": sound_id,
+                        "name": sound_name
+                    }
+                },
+                "method": "do"
+            }
+            
+            # 注意：這個請求是發送到通用的 /ds 端點
+            confirm_response = self._send_request(confirm_payload)
         
-        # 注意：這個請求是發送到通用的 /ds 端點
-        confirm_response = self._send_request(confirm_payload)
-        
-        if confirm_response and str(confirm_response.get("error_code")) == "0":
+        if _ok(confirm_response):
             print(f"  - 成功建立/覆蓋 ID {sound_id} 的音檔。\n")
             return True
         else:
@@ -669,6 +866,8 @@ class VigiApi:
         # zip 會將兩個列表配對，例如 (101, path1), (102, path2), ...
         target_slots = range(101, 101 + len(audio_files))
         
+        # 攝影機只有一個上傳暫存位置（上傳後由下一次確認請求指派 ID），
+        # 因此各槽位必須依序「上傳 + 確認」，無法並行上傳
         all_successful = True
         for sound_id, file_path in zip(target_slots, audio_files):
             # 檢查目前槽位是否已經有聲音
@@ -732,7 +931,7 @@ class VigiApi:
         response = self._send_request(payload)
         
         # 檢查回應
-        if response and str(response.get("error_code")) == "0":
+        if _ok(response):
             print(f"  - 成功發送刪除指令。\n")
             return True
         else:
@@ -787,12 +986,12 @@ class VigiApi:
         response = self._send_request(payload)
         
         # 解析攝影機的回應結果
-        if response and str(response.get("error_code")) == "0":
-            # error_code 為 "0" 表示操作成功
+        if _ok(response):
+            # error_code 為 0 表示操作成功
             print(f"  - 成功將 ID {sound_id} 的名稱修改為 '{new_name}'。\n")
             return True
         else:
-            # 任何非 "0" 的 error_code 都表示操作失敗
+            # 任何非 0 的 error_code 都表示操作失敗
             print(f"  - 錯誤：修改名稱操作失敗。")
             if response:
                 print(f"    - 攝影機回應: {response}")